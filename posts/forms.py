@@ -3,7 +3,46 @@ from django import forms
 from .models import Post, Comment
 
 
+IMAGE_SIGNATURES = (
+    b'\x89PNG\r\n\x1a\n',
+    b'\xff\xd8\xff',
+    b'GIF87a',
+    b'GIF89a',
+    b'BM',
+    b'II*\x00',
+    b'MM\x00*',
+    b'\x00\x00\x01\x00',
+)
+
+
+def has_image_signature(file):
+    """
+    Check the first bytes of an uploaded file against known image formats.
+    """
+    header = file.read(12)
+    file.seek(0)
+    is_webp = header[:4] == b'RIFF' and header[8:12] == b'WEBP'
+    return is_webp or header.startswith(IMAGE_SIGNATURES)
+
+
 class PostForm(forms.ModelForm):
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        image = self.fields['image']
+        to_python = image.to_python
+
+        def sniff_then_open(data):
+            # Reject files with an unknown header before Pillow opens them.
+            # Missing and empty files are left to the default validation.
+            if getattr(data, 'size', 0) and not has_image_signature(data):
+                raise forms.ValidationError(
+                    image.error_messages['invalid_image'],
+                    code='invalid_image',
+                )
+            return to_python(data)
+
+        image.to_python = sniff_then_open
+
     class Meta:
         model = Post
         fields = ('group', 'text', 'image')
@@ -0,0 +1,23 @@
+# Generated by Django 2.2.21 on 2026-10-15 12:30
+
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+        ('posts', '0009_auto_20261015_1200'),
+    ]
+
+    operations = [
+        migrations.AlterUniqueTogether(
+            name='follow',
+            unique_together=set(),
+        ),
+        migrations.AddConstraint(
+            model_name='follow',
+            constraint=models.UniqueConstraint(fields=('user', 'author'), name='uniq_follow'),
+        ),
+    ]
@@ -0,0 +1,21 @@
+# Generated by Django 2.2.21 on 2026-10-15 13:00
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('posts', '0010_auto_20261015_1230'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='post',
+            index=models.Index(fields=['-pub_date'], name='post_pubdate_desc_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='comment',
+            index=models.Index(fields=['-created'], name='comment_created_desc_idx'),
+        ),
+    ]
@@ -0,0 +1,20 @@
+# Generated by Django 2.2.21 on 2026-10-15 14:00
+
+from django.db import migrations, models
+import django.utils.timezone
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('posts', '0011_auto_20261015_1300'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='post',
+            name='updated',
+            field=models.DateTimeField(auto_now=True, db_index=True, default=django.utils.timezone.now, verbose_name='date updated'),
+            preserve_default=False,
+        ),
+    ]
@@ -11,6 +11,11 @@ class Post(models.Model):
     """
     text = models.TextField()
     pub_date = models.DateTimeField('date published', auto_now_add=True)
+    updated = models.DateTimeField(
+        'date updated',
+        auto_now=True,
+        db_index=True
+    )
     author = models.ForeignKey(
         User, 
         on_delete=models.CASCADE, 
@@ -27,6 +32,20 @@ class Post(models.Model):
 
     class Meta:
         ordering = ['-pub_date']
+        indexes = [
+            models.Index(
+                fields=['-pub_date'],
+                name='post_pubdate_desc_idx'
+            ),
+            models.Index(
+                fields=['author', '-pub_date'],
+                name='post_author_pubdate_idx'
+            ),
+            models.Index(
+                fields=['group', '-pub_date'],
+                name='post_group_pubdate_idx'
+            ),
+        ]
 
 
 class Group(models.Model):
@@ -41,6 +60,17 @@ class Group(models.Model):
         return self.title
 
 
+class CommentQuerySet(models.QuerySet):
+    def create_many(self, post, author, texts):
+        """
+        Create a :model:`posts.Comment` of a given :model:`auth.User`
+        for each text in `texts` with a single INSERT.
+        """
+        return self.bulk_create(
+            self.model(post=post, author=author, text=text) for text in texts
+        )
+
+
 class Comment(models.Model):
     """
     Stores a single comment entry of :model:`posts.Post`.
@@ -59,8 +89,20 @@ class Comment(models.Model):
     text = models.TextField()
     created = models.DateTimeField('date created', auto_now_add=True)
 
+    objects = CommentQuerySet.as_manager()
+
     class Meta:
         ordering = ['-created']
+        indexes = [
+            models.Index(
+                fields=['-created'],
+                name='comment_created_desc_idx'
+            ),
+            models.Index(
+                fields=['post', '-created'],
+                name='comment_post_created_idx'
+            ),
+        ]
 
 
 class Follow(models.Model):
@@ -80,4 +122,9 @@ class Follow(models.Model):
     )
 
     class Meta:
-        unique_together = ('user', 'author')
+        constraints = [
+            models.UniqueConstraint(
+                fields=['user', 'author'],
+                name='uniq_follow'
+            ),
+        ]
@@ -0,0 +1,32 @@
+import hashlib
+
+from django.core.cache import cache
+from django.core.paginator import Paginator
+
+
+def cached_paginator(object_list, per_page, timeout=60, version=None):
+    """
+    Return a Paginator for a given queryset, whose object count
+    is stored in cache for `timeout` seconds.
+
+    The cache key is built from the SQL of the queryset, so each
+    distinct list (index, group, profile) gets its own entry.
+    The SQL does not change when posts are added or removed, so callers
+    pass a `version` that is mixed into the key to drop stale counts.
+    Without a version the count is not cached.
+    """
+    paginator = Paginator(object_list, per_page)
+    if version is None:
+        return paginator
+
+    key = 'paginator:' + hashlib.md5(
+        f'{object_list.query}:{version}'.encode()
+    ).hexdigest()
+
+    count = cache.get(key)
+    if count is None:
+        cache.set(key, paginator.count, timeout)
+    else:
+        paginator.count = count
+
+    return paginator
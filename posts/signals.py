@@ -0,0 +1,49 @@
+import time
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import receiver
+
+
+POST_LIST_VERSION_KEY = 'posts:list-version'
+
+
+def cache_is_shared():
+    """
+    Check whether the default cache is shared between processes.
+    LocMem and Dummy caches live in a single process only.
+    """
+    backend = settings.CACHES['default']['BACKEND']
+    return not backend.endswith(('.LocMemCache', '.DummyCache'))
+
+
+def get_post_list_version():
+    """
+    Return a version of the set of :model:`posts.Post`, which changes
+    every time a post is created or deleted.
+
+    Return None if the cache is not shared, since a version bumped
+    in one process would not be seen by the others.
+    """
+    if not cache_is_shared():
+        return None
+    return cache.get_or_set(POST_LIST_VERSION_KEY, time.time, None)
+
+
+def bump_post_list_version():
+    """
+    Invalidate cached post counts by setting a new version.
+    """
+    cache.set(POST_LIST_VERSION_KEY, time.time(), None)
+
+
+@receiver(post_save, sender='posts.Post')
+def post_created(sender, created, **kwargs):
+    if created:
+        bump_post_list_version()
+
+
+@receiver(post_delete, sender='posts.Post')
+def post_deleted(sender, **kwargs):
+    bump_post_list_version()
@@ -1,4 +1,5 @@
 import tempfile
+from unittest import mock
 
 from PIL import Image
 
@@ -8,17 +9,29 @@ from django.core.cache import cache
 from django.core.files.uploadedfile import SimpleUploadedFile
 
 from .models import User, Post, Group, Follow, Comment
+from .forms import PostForm
+from .views import COMMENTS_PER_PAGE
+from .signals import get_post_list_version
 
 
-DUMMY_CACHE = {
+LOCMEM_CACHE = {
     'default': {
-        'BACKEND': 'django.core.cache.backends.dummy.DummyCache',
+        'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+        'LOCATION': 'posts-tests',
+    }
+}
+
+FILE_CACHE = {
+    'default': {
+        'BACKEND': 'django.core.cache.backends.filebased.FileBasedCache',
+        'LOCATION': tempfile.mkdtemp(),
     }
 }
 
 
 class TestMisc(TestCase):
     def setUp(self):
+        cache.clear()
         self.client = Client()
 
     def test_404(self):
@@ -37,11 +50,31 @@ class TestMisc(TestCase):
 
         self.client.post(reverse('new_post'), {'text': 'cache test'})
         response = self.client.get(reverse('index'))
-        self.assertNotContains(response, 'cache test')
+        self.assertContains(response, 'cache test')
 
-        cache.clear()
+    def test_cache_anonymous(self):
+        author = User.objects.create_user(
+            username='morty',
+            email='morty.s@test.com',
+            password='fungi123'
+        )
+        post = Post.objects.create(text='first cached post', author=author)
+        self.client.get(reverse('index'))
+
+        # only the two version lookups
+        with self.assertNumQueries(2):
+            response = self.client.get(reverse('index'))
+        self.assertEqual(response.templates, [])
+        self.assertContains(response, 'first cached post')
+
+        Post.objects.create(text='second cached post', author=author)
         response = self.client.get(reverse('index'))
-        self.assertContains(response, 'cache test')
+        self.assertContains(response, 'second cached post')
+
+        post.text = 'edited cached post'
+        post.save()
+        response = self.client.get(reverse('index'))
+        self.assertContains(response, 'edited cached post')
 
 
 class TestPostsUnauthorized(TestCase):
@@ -86,21 +119,25 @@ class TestPostsUnauthorized(TestCase):
         self.assertEqual(Comment.objects.all().count(), 0)
 
 
+@override_settings(CACHES=LOCMEM_CACHE)
 class TestPostsAuthorized(TestCase):
-    def setUp(self):
-        self.client = Client()
-        self.user = User.objects.create_user(
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = User.objects.create_user(
             username='pickle',
             email='rick.s@test.com',
             password='fungi123',
         )
-        self.client.force_login(self.user)
-        self.group = Group.objects.create(
+        cls.group = Group.objects.create(
             title='Test Group',
             slug='test-group'
         )
 
-    @override_settings(CACHE=DUMMY_CACHE)
+    def setUp(self):
+        cache.clear()
+        self.client = Client()
+        self.client.force_login(self.user)
+
     def _check_pages_content(self, text, author, id, group, image=False):
         links = {
             'index': reverse('index'),
@@ -113,7 +150,6 @@ class TestPostsAuthorized(TestCase):
         }
 
         for k,v in links.items():
-            cache.clear()
             response = self.client.get(v)
 
             if image:
@@ -146,6 +182,42 @@ class TestPostsAuthorized(TestCase):
             ))
         self.assertEqual(response.status_code, 200)
 
+    @override_settings(CACHES=FILE_CACHE)
+    def test_new_post_listed_after_cached_count(self):
+        cache.clear()
+        links = (
+            reverse('profile', kwargs={'username': self.user.username}),
+            reverse('group_posts', kwargs={'slug': self.group.slug}),
+        )
+        for link in links:
+            self.client.get(link)
+
+        self.client.post(
+            reverse('new_post'),
+            data={'group': self.group.id, 'text': 'first post'}
+        )
+
+        for link in links:
+            response = self.client.get(link)
+            self.assertEqual(len(response.context['page']), 1)
+            self.assertContains(response, 'first post')
+
+    @override_settings(CACHES=FILE_CACHE)
+    def test_post_list_version(self):
+        cache.clear()
+        version = get_post_list_version()
+        post = Post.objects.create(text='versioned post', author=self.user)
+        self.assertNotEqual(get_post_list_version(), version)
+
+        version = get_post_list_version()
+        post.text = 'edited versioned post'
+        post.save()
+        Comment.objects.create(post=post, author=self.user, text='comment')
+        self.assertEqual(get_post_list_version(), version)
+
+        post.delete()
+        self.assertNotEqual(get_post_list_version(), version)
+
     def test_post_new(self):
         response = self.client.get(reverse('new_post'))
         self.assertEqual(response.status_code, 200)
@@ -161,11 +233,40 @@ class TestPostsAuthorized(TestCase):
         self.assertTrue(Post.objects.filter(**post_data).exists())
                 
     def test_post_published(self):
+        user2 = User.objects.create(
+            username='scnd_usr',
+            email='scnd@test.com',
+            password='pa$$',
+        )
+        Post.objects.create(text='Test Post from user2', author=user2)
+        Follow.objects.create(user=self.user, author=user2)
         post = Post.objects.create(
             group=self.group,
             text='Test Post',
             author=self.user
         )
+        Comment.objects.create(post=post, author=user2, text='test comment')
+
+        # Every page costs session and user lookups, plus:
+        expected_queries = {
+            # version (2), page count, posts
+            reverse('index'): 6,
+            # author, page count, posts, followers, following, post count
+            reverse('profile', kwargs={'username': self.user.username}): 8,
+            # post, followers, following, post count, comments
+            reverse('post', kwargs={
+                'username': self.user.username,
+                'post_id': post.id,
+            }): 7,
+            # group, page count, posts
+            reverse('group_posts', kwargs={'slug': self.group.slug}): 5,
+            # page count, posts
+            reverse('follow_index'): 4,
+        }
+        for url, expected in expected_queries.items():
+            with self.subTest(url=url), self.assertNumQueries(expected):
+                self.client.get(url)
+
         self._check_pages_content(post.text, self.user, post.id, self.group)
     
     def test_post_edit(self):
@@ -200,7 +301,7 @@ class TestPostsAuthorized(TestCase):
             text=post_data['text']
         )
 
-    @override_settings(MEDIA_ROOT=tempfile.mkdtemp(), CACHE=DUMMY_CACHE)
+    @override_settings(MEDIA_ROOT=tempfile.mkdtemp())
     def test_image(self):
         img = self._create_image()
         resp = self.client.post(
@@ -246,6 +347,20 @@ class TestPostsAuthorized(TestCase):
         self.assertFormError(response, 'form', 'image', error_msg)
         self.assertNotContains(response, '<img')
 
+    def test_invalid_image_not_opened(self):
+        img = SimpleUploadedFile('test.png', b'not an image', 'image/png')
+
+        with mock.patch('PIL.Image.open') as image_open:
+            form = PostForm({'text': 'post'}, files={'image': img})
+            self.assertTrue(form.has_error('image', code='invalid_image'))
+
+        image_open.assert_not_called()
+
+    def test_empty_image(self):
+        img = SimpleUploadedFile('test.png', b'', 'image/png')
+        form = PostForm({'text': 'post'}, files={'image': img})
+        self.assertTrue(form.has_error('image', code='empty'))
+
     def test_follow(self):
         user2 = User.objects.create(
             username='scnd_usr',
@@ -353,3 +468,47 @@ class TestPostsAuthorized(TestCase):
         self.assertEqual(comment.text, 'test comment')
         self.assertEqual(comment.author, self.user)
         self.assertEqual(comment.post, post)
+
+    def test_comments_listed(self):
+        post = Post.objects.create(
+            text='Test post text',
+            author=self.user
+        )
+        texts = ['first comment', 'second comment', 'third comment']
+        Comment.objects.create_many(post, self.user, texts)
+
+        response = self.client.get(
+            reverse(
+                'post',
+                kwargs={
+                    'username': self.user.username,
+                    'post_id': post.id
+                }
+            )
+        )
+
+        self.assertEqual(len(response.context['comments']), len(texts))
+        for text in texts:
+            self.assertContains(response, text)
+
+    def test_comments_paginated(self):
+        post = Post.objects.create(
+            text='Test post text',
+            author=self.user
+        )
+        texts = [f'comment {i}' for i in range(COMMENTS_PER_PAGE + 1)]
+        Comment.objects.create_many(post, self.user, texts)
+        url = reverse(
+            'post',
+            kwargs={
+                'username': self.user.username,
+                'post_id': post.id
+            }
+        )
+
+        response = self.client.get(url)
+        self.assertEqual(len(response.context['comments']), COMMENTS_PER_PAGE)
+        self.assertContains(response, '?page=2')
+
+        response = self.client.get(url, {'page': 2})
+        self.assertEqual(len(response.context['comments']), 1)
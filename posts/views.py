@@ -1,17 +1,69 @@
+import hashlib
+
 from django.shortcuts import render, get_object_or_404, redirect
 from django.contrib.auth.decorators import login_required
 from django.urls import reverse
 from django.core.paginator import Paginator
 from django.contrib.auth import get_user_model
 from django.views.decorators.http import require_POST
-from django.views.decorators.cache import cache_page
-
-from .models import Post, Group, Follow
+from django.db.models import (
+    BooleanField, Count, Exists, IntegerField, Max, OuterRef, Subquery,
+    Value
+)
+from django.db.models.functions import Coalesce
+from django.conf import settings
+from django.core.cache import cache
+from django.http import HttpResponse
+
+from .models import Post, Group, Follow, Comment
 from .forms import PostForm, CommentForm
+from .paginators import cached_paginator
+from .signals import get_post_list_version
 
 
 User = get_user_model()
 
+# Columns rendered by includes/post_item.html, the rest stay deferred.
+POST_LIST_FIELDS = (
+    'id',
+    'text',
+    'pub_date',
+    'image',
+    'author__username',
+    'group__slug',
+    'group__title',
+)
+
+COMMENTS_PER_PAGE = 50
+
+
+def with_comment_counts(posts):
+    """
+    Annotate :model:`posts.Post` with `num_comments`, counted by
+    a correlated subquery for each fetched row only.
+    """
+    comments = Comment.objects.filter(
+        post=OuterRef('pk')
+    ).order_by().values('post').annotate(
+        count=Count('pk')
+    ).values('count')
+
+    return posts.annotate(num_comments=Coalesce(
+        Subquery(comments, output_field=IntegerField()), 0
+    ))
+
+
+def get_index_version():
+    """
+    Return a version of :view:`posts.index` content, which changes
+    when a :model:`posts.Post` is published or edited
+    and when a :model:`posts.Comment` is added.
+    It is read from the database, so all processes agree on it.
+    """
+    updated = Post.objects.aggregate(last=Max('updated'))['last']
+    comment = Comment.objects.aggregate(last=Max('id'))['last']
+    return f'{updated}:{comment}'
+
 
 def page_not_found(request, exception):
     """
@@ -27,10 +79,34 @@ def server_error(request):
     return render(request, 'misc/500.html', status=500)
 
 
-@cache_page(20, key_prefix='index_page')
+def _render_index(request, version):
+    posts = Post.objects.all().select_related(
+        'author', 'group'
+    ).only(*POST_LIST_FIELDS)
+    paginator = cached_paginator(
+        posts, 10, version=get_post_list_version()
+    )
+    page_number = request.GET.get('page')
+    page = paginator.get_page(page_number)
+    page.object_list = with_comment_counts(page.object_list)
+
+    return render(
+        request, 
+        'index.html', 
+        {
+            'page': page,
+            'paginator': paginator,
+            'version': version,
+            'timeout': settings.INDEX_CACHE_TIMEOUT
+        }
+    )
+
+
 def index(request):
     """
     Display most recent :model:`posts.Post`, 10 per page.
+    For anonymous users the whole page is cached for
+    `INDEX_CACHE_TIMEOUT` seconds or until its version changes.
 
     **Context**
 
@@ -38,24 +114,31 @@ def index(request):
         A list of 10 :model:`posts.Post`.
     ``paginator``
         A Paginator object.
+    ``version``
+        Version of posts and comments from `get_index_version`,
+        used as a key for the cached page content.
+    ``timeout``
+        Timeout of the cached page content.
 
     **Template**
 
     :template:`index.html`
     """
-    posts = Post.objects.all().select_related('author')
-    paginator = Paginator(posts, 10)
-    page_number = request.GET.get('page')
-    page = paginator.get_page(page_number)
+    version = get_index_version()
 
-    return render(
-        request, 
-        'index.html', 
-        {
-            'page': page,
-            'paginator': paginator
-        }
-    )
+    if request.user.is_anonymous:
+        page_number = request.GET.get('page')
+        key = 'index:' + hashlib.md5(
+            f'{page_number}:{version}'.encode()
+        ).hexdigest()
+        content = cache.get_or_set(
+            key,
+            lambda: _render_index(request, version).content,
+            settings.INDEX_CACHE_TIMEOUT
+        )
+        return HttpResponse(content)
+
+    return _render_index(request, version)
 
 
 def group_posts(request, slug):
@@ -77,11 +160,16 @@ def group_posts(request, slug):
     :template:`group.html`
     """
     group = get_object_or_404(Group, slug=slug)
-    posts = group.posts.all().select_related('author')
+    posts = group.posts.all().select_related(
+        'author', 'group'
+    ).only(*POST_LIST_FIELDS)
 
-    paginator = Paginator(posts, 10)
+    paginator = cached_paginator(
+        posts, 10, version=get_post_list_version()
+    )
     page_number = request.GET.get('page')
     page = paginator.get_page(page_number)
+    page.object_list = with_comment_counts(page.object_list)
 
     context = {
             'group': group, 
@@ -140,23 +228,35 @@ def profile(request, username):
 
     :template:`profile/profile.html`
     """
-    
-    author = get_object_or_404(User, username=username)
-    author_posts = author.posts.all()
-
-    following = not request.user.is_anonymous and Follow.objects.filter(
-        user=request.user, author=author
-    ).exists()
+    if request.user.is_anonymous:
+        is_followed = Value(False, output_field=BooleanField())
+    else:
+        is_followed = Exists(
+            Follow.objects.filter(user=request.user, author=OuterRef('pk'))
+        )
+
+    # Exact match is served by the unique index on username,
+    # case-insensitive lookups (iexact, Lower) would bypass it.
+    author = get_object_or_404(
+        User.objects.annotate(is_followed=is_followed),
+        username=username
+    )
+    author_posts = author.posts.select_related(
+        'group', 'author'
+    ).only(*POST_LIST_FIELDS)
 
-    paginator = Paginator(author_posts, 10)
+    paginator = cached_paginator(
+        author_posts, 10, version=get_post_list_version()
+    )
     page_number = request.GET.get('page')
     page = paginator.get_page(page_number)
+    page.object_list = with_comment_counts(page.object_list)
 
     context = {
             'author': author, 
             'page': page,
             'paginator': paginator,
-            'following': following
+            'following': author.is_followed
     }
 
     return render(request, 'profile/profile.html', context)
@@ -174,7 +274,8 @@ def post_view(request, username, post_id):
     ``post``
         An instance of :model:`posts.Post`.
     ``comments``
-        A list of :model:`posts.Comment` of this post.
+        A list of `COMMENTS_PER_PAGE` :model:`posts.Comment` of this post,
+        most recent first.
     ``form``
         A form to post a comment for this post.
 
@@ -182,12 +283,20 @@ def post_view(request, username, post_id):
 
     :template:`post.html`
     """
-    author = get_object_or_404(User, username=username)
     post = get_object_or_404(
-        Post, 
-        id=post_id, 
-        author=author)
-    comments = post.comments.select_related('author')
+        with_comment_counts(Post.objects.select_related('author', 'group')),
+        id=post_id,
+        author__username=username
+    )
+    author = post.author
+    comments = post.comments.select_related('author').only(
+        'id', 'text', 'post', 'author__username'
+    )
+    paginator = Paginator(comments, COMMENTS_PER_PAGE)
+    # The post is already annotated with its comment count
+    paginator.count = post.num_comments
+    page_number = request.GET.get('page')
+    comments = paginator.get_page(page_number)
     form = CommentForm(request.POST or None)
 
     context = {
@@ -220,12 +329,10 @@ def post_edit(request, username, post_id):
 
     :template:`posts/edit_post.html`
     """
-    author = get_object_or_404(User, username=username)
+    post = get_object_or_404(Post, id=post_id, author__username=username)
 
-    if request.user != author:
+    if request.user.id != post.author_id:
         return redirect('post', username=username, post_id=post_id)
-    
-    post = get_object_or_404(Post, id=post_id, author=author)
 
     form = PostForm(
         request.POST or None, 
@@ -234,7 +341,9 @@ def post_edit(request, username, post_id):
     )
 
     if form.is_valid():
-        form.save()
+        if form.has_changed():
+            post = form.save(commit=False)
+            post.save(update_fields=[*form.changed_data, 'updated'])
         return redirect('post', username=username, post_id=post_id)
 
     return render(request, 'posts/new_post.html', {'form': form, 'post': post})
@@ -278,12 +387,15 @@ def follow_index(request):
     :template:`posts/follow.html`
     """
     posts = Post.objects.filter(
-        author__following__user=request.user
-    ).select_related('author')
+        author_id__in=Follow.objects.filter(
+            user=request.user
+        ).values('author_id')
+    ).select_related('author', 'group').only(*POST_LIST_FIELDS)
 
     paginator = Paginator(posts, 10)
     page_number = request.GET.get('page')
     page = paginator.get_page(page_number)
+    page.object_list = with_comment_counts(page.object_list)
 
     return render(
         request, 
@@ -304,7 +416,10 @@ def profile_follow(request, username):
     author = get_object_or_404(User, username=username)
 
     if request.user != author:
-        Follow.objects.get_or_create(user=request.user, author=author)
+        Follow.objects.bulk_create(
+            [Follow(user=request.user, author=author)],
+            ignore_conflicts=True
+        )
     return redirect('profile', username=username)
 
 
@@ -37,7 +37,7 @@ ALLOWED_HOSTS = [
 
 INSTALLED_APPS = [
     'users',
-    'posts',
+    'posts.apps.PostsConfig',
     'django.contrib.sites',
     'django.contrib.flatpages',
     'django.contrib.admin',
@@ -162,3 +162,15 @@ CACHES = {
         'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
     }
 }
+
+# In production set REDIS_URL (e.g. redis://127.0.0.1:6379/1)
+# to share cached pages between worker processes.
+REDIS_URL = os.environ.get('REDIS_URL')
+if REDIS_URL:
+    CACHES['default'] = {
+        'BACKEND': 'django_redis.cache.RedisCache',
+        'LOCATION': REDIS_URL,
+    }
+
+# Cache timeouts, in seconds
+INDEX_CACHE_TIMEOUT = 300